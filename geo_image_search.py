@@ -1,12 +1,203 @@
 import os
-import re
+import math
 import sys
+import struct
+import dbm
+import shelve
+from collections import namedtuple
 import argparse
-from shutil import copyfile
-from exif import Image
-from geopy.geocoders import Nominatim
-from geopy import distance
-import pprint
+from shutil import copyfile, SameFileError
+from multiprocessing import Pool
+
+EARTH_RADIUS_MILES = 3958.7613 # mean radius
+GEOCODE_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "geo_image_search", "nominatim")
+
+# What we keep of a geopy Location; the geocode cache stores it as a plain tuple.
+CachedLocation = namedtuple("CachedLocation", ["address", "latitude", "longitude"])
+
+def haversine_from(lat1, lon1):
+    # Returns distance_miles(lat2, lon2): haversine great-circle distance from
+    # (lat1, lon1) on a spherical earth, within ~0.5% of geopy's ellipsoidal
+    # geodesic, which is plenty for a radius search.  Everything that depends
+    # only on the fixed centre is worked out here, once, and the returned
+    # function reads nothing but its own locals and closure cells.
+    phi1 = math.radians(lat1)
+    cos_phi1 = math.cos(phi1)
+    diameter = 2 * EARTH_RADIUS_MILES
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+
+    def distance_miles(lat2, lon2):
+        phi2 = radians(lat2)
+        a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin(radians(lon2 - lon1) / 2) ** 2
+        return diameter * asin(sqrt(a))
+    return distance_miles
+
+def search_box(lat1, lon1, radius_miles):
+    # Returns inside(lat2, lon2), which is False when (lat2, lon2) is certainly
+    # more than radius_miles from (lat1, lon1), using only subtractions and
+    # compares.  The box is the exact lat/lon extent of the search circle on the
+    # sphere haversine_from() uses, so it never rejects a point that the
+    # haversine would accept; lon is unconstrained if the circle holds a pole.
+    angle = radius_miles / EARTH_RADIUS_MILES
+    lat_tol = math.degrees(angle) + 1e-9
+    if abs(lat1) + lat_tol >= 90:
+        lon_tol = 180
+    else:
+        lon_tol = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat1)))) + 1e-9
+
+    def inside(lat2, lon2):
+        if abs(lat2 - lat1) > lat_tol:
+            return False
+        dlon = abs(lon2 - lon1)
+        return min(dlon, 360 - dlon) <= lon_tol
+    return inside
+
+def fast_copy(src, dst):
+    # copy_file_range() copies inside the kernel and lets btrfs/XFS reflink
+    # instead of copying; shutil.copyfile (sendfile on Linux) is the fallback
+    # for other platforms and for filesystems that refuse it.
+    if hasattr(os, "copy_file_range"):
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            raise SameFileError(f"{src!r} and {dst!r} are the same file")
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining <= 0:
+                return
+        except OSError:
+            pass
+    copyfile(src, dst)
+
+DOTS_AND_COMMAS = str.maketrans(".,", "  ") # turns them into spaces for str.split()
+JPEG_EXTENSIONS = (".jpg", ".jpeg", ".JPG", ".JPEG", ".Jpg", ".Jpeg")
+IMAGE_BATCH_SIZE = 32 # images per worker task; big directories are split into several
+
+def positive_int(value):
+    # argparse type= for counts that must be at least 1, e.g. --workers.
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"must be a whole number, got {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def read_gps_batch(batch):
+    # Pool task: batch is (dir_path, image_names, note) from GeoImageSearch.image_batches().
+    dir_path, image_names, note = batch
+    return dir_path, image_names, note, [read_gps_coords(os.path.join(dir_path, file_name))
+                                         for file_name in image_names]
+
+def read_exif_block(image_file):
+    # Walk the JPEG segment markers, seeking past every segment but the EXIF
+    # APP1, and return that segment's TIFF block, or None if the file has no
+    # EXIF.  Only marker headers and the EXIF block itself are read.
+    if image_file.read(2) != b'\xff\xd8':
+        raise ValueError("not a JPEG file")
+    while True:
+        header = image_file.read(2)
+        if len(header) < 2:
+            return None
+        if header[0] != 0xFF:
+            raise ValueError(f"bad JPEG marker at byte {image_file.tell() - 2}")
+        marker = header[1]
+        if marker == 0xFF: # fill byte
+            image_file.seek(-1, os.SEEK_CUR)
+            continue
+        if marker in (0xD9, 0xDA): # end of image / start of scan: no more metadata
+            return None
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7: # markers without a length
+            continue
+        # A short or undersized length would seek backwards onto this same
+        # marker and loop forever, so give up on the file instead.
+        length_bytes = image_file.read(2)
+        length = int.from_bytes(length_bytes, 'big') - 2
+        if len(length_bytes) < 2 or length < 0:
+            raise ValueError("truncated JPEG segment")
+        if marker == 0xE1:
+            ident = image_file.read(6)
+            length -= 6
+            if len(ident) < 6 or length < 0:
+                raise ValueError("truncated JPEG segment")
+            if ident == b'Exif\x00\x00':
+                return image_file.read(length)
+            # an XMP or other non-EXIF APP1
+        image_file.seek(length, os.SEEK_CUR)
+
+def ifd_entries(tiff, order, offset):
+    # Yield (tag, type, count, value_offset) for each entry of the IFD at offset.
+    (count,) = struct.unpack_from(order + 'H', tiff, offset)
+    for entry in range(offset + 2, offset + 2 + 12 * count, 12):
+        tag, kind, n = struct.unpack_from(order + 'HHI', tiff, entry)
+        yield tag, kind, n, entry + 8
+
+def read_gps_ifd(tiff):
+    # Return {tag: value} for the GPS IFD of an EXIF TIFF block, decoding only
+    # the tags this script needs: 1/3 latitude/longitude ref, 2/4 the DMS values.
+    if tiff[:2] == b'II':
+        order = '<'
+    elif tiff[:2] == b'MM':
+        order = '>'
+    else:
+        raise ValueError("bad TIFF byte order")
+    (ifd0,) = struct.unpack_from(order + 'I', tiff, 4)
+    gps_ifd = None
+    for tag, _, _, value_offset in ifd_entries(tiff, order, ifd0):
+        if tag == 0x8825:
+            (gps_ifd,) = struct.unpack_from(order + 'I', tiff, value_offset)
+    gps = {}
+    if gps_ifd is None:
+        return gps
+    for tag, kind, n, value_offset in ifd_entries(tiff, order, gps_ifd):
+        if tag in (1, 3) and kind == 2: # ASCII 'N'/'S', 'E'/'W', stored inline
+            gps[tag] = tiff[value_offset:value_offset + 1]
+        elif tag in (2, 4) and kind in (5, 10) and n == 3: # (un)signed rationals
+            (data_offset,) = struct.unpack_from(order + 'I', tiff, value_offset)
+            parts = struct.unpack_from(order + ('6I' if kind == 5 else '6i'), tiff, data_offset)
+            gps[tag] = (parts[0] / parts[1], parts[2] / parts[3], parts[4] / parts[5])
+    return gps
+
+def read_gps_coords(imagename):
+    # Runs in a worker process, so it must not touch GeoImageSearch state.
+    # Returns (latitude, longitude, notes) in signed decimal degrees; either
+    # coordinate may be None and notes holds the messages for --verbose mode.
+    lat_deg_dec = None
+    long_deg_dec = None
+    notes = []
+    try:
+        with open(imagename, 'rb') as image_file:
+            tiff = read_exif_block(image_file)
+    except Exception as e:
+        notes.append(f": Corrupt file? {e}")
+        return lat_deg_dec, long_deg_dec, notes
+    if tiff is None:
+        notes.append(" has no EXIF data.")
+        return lat_deg_dec, long_deg_dec, notes
+
+    try:
+        gps = read_gps_ifd(tiff)
+    except Exception as e:
+        notes.append(f": {e}")
+        return lat_deg_dec, long_deg_dec, notes
+    if 2 in gps:
+        lat_deg_dec = gps[2][0] + gps[2][1]/60 + gps[2][2]/3600
+        if gps.get(1) == b'S':
+            lat_deg_dec = -lat_deg_dec
+    else:
+        notes.append(" has no latitude.")
+    if 4 in gps:
+        long_deg_dec = gps[4][0] + gps[4][1]/60 + gps[4][2]/3600
+        if gps.get(3) == b'W':
+            long_deg_dec = -long_deg_dec
+    else:
+        notes.append(" has no longitude.")
+    return lat_deg_dec, long_deg_dec, notes
+
 
 class GeoImageSearch: # pylint: disable=too-many-instance-attributes
     def __init__(self):
@@ -15,27 +206,25 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
         self.args = None
         self.address = None
         self.root_images_directory = None
-        self.od_re = None
         self.location = None
         self.search_coords = None
+        self.distance_miles = None # haversine_from(search_coords), set in set_location()
+        self.in_search_box = None # search_box(search_coords, radius), set in set_location()
         self.image_addresses = False
         self.images_directory = None
         self.location_address = ""
         self.output_directory = ""
         self.user_output_directory = None
+        self.output_prefix = None # normalised output_directory + os.sep, pruned from the walk
         self.verbose = ""
         self.lat = None # the center of the target location
         self.lon = None # the center of the target location
         self.radius = .5 # the radius in feet of images to look for.
         self.far = False
+        self.workers = None # None lets multiprocessing.Pool use os.cpu_count()
         self.argv = sys.argv[1:]
-        self.geolocator = Nominatim(user_agent="github/stbrie: geo_image_search")
-        self.ts_re = re.compile(r'^.*/$')
-        self.fs_re = re.compile(r'([.,\s]+)')
-        self.jpeg_file_regex = re.compile(r"^.*\.(jpg)|(jpeg)$")
-        self.printed_directory = {}
+        self.geolocator = None # built on the first cache miss, see nominatim()
         print('ARGV        :', self.argv)
-        self.loc_format = '{0:}: {1:.7n}, {2:.7n} ({3:.3n})'
 
     def get_opts(self):
         parser = argparse.ArgumentParser(
@@ -54,6 +243,7 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
         parser.add_argument("-g", "--longitude", action="store", help="(optional) if set, use this decimal longitude to center the search.")
         parser.add_argument("-r", "--radius", action="store", default=.5, help="(optional, defaults to 2640) the radius of the search in feet.")
         parser.add_argument("-x", "--far", action="store_true", help="(optional) show images that are further than radius from centerpoint")
+        parser.add_argument("-w", "--workers", action="store", type=positive_int, help="(optional, defaults to the number of CPUs) processes used to read image metadata.")
         try:
             args = parser.parse_args()
         except Exception as e:
@@ -68,6 +258,8 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
         self.root_images_directory = args.root
         self.lat = args.latitude
         self.lon = args.longitude
+        self.far = args.far
+        self.workers = args.workers
         if args.radius != .5:
             self.radius = abs(float(args.radius) / 5280)
         
@@ -81,13 +273,15 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
             print(f"Latitude: {self.lat}")
             print(f"Longitude: {self.lon}")
             print(f"Radius: {self.radius}")
+            print(f"Far: {self.far}")
+            print(f"Workers: {self.workers}")
 
     def set_root_images_directory(self):
         if not self.root_images_directory:
             print("No images root directory specified.  --images-root-directory is not optional")
             sys.exit(2)
-        if not self.ts_re.search(self.root_images_directory):
-            self.root_images_directory = self.root_images_directory 
+        if not self.root_images_directory.endswith(("/", os.sep)):
+            self.root_images_directory = self.root_images_directory + "/"
 
     def set_output_directory(self):
         
@@ -96,12 +290,13 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
                 print('No output directory specified and not find only. Use one or the other.')
                 sys.exit(3)
             else:
-               if self.verbose:
+                # runs of dots, commas and whitespace become a single "_"; a name
+                # made only of those still needs its own folder under geo_loc/
+                od_stripped = "_".join(self.user_output_directory.translate(DOTS_AND_COMMAS).split()) or "_"
+                self.output_directory = self.root_images_directory + "geo_loc/" + od_stripped + "/"
+                if self.verbose:
                     print('User output directory: ' + self.user_output_directory)
-                    od_stripped = self.fs_re.sub("_",self.user_output_directory)
                     print('   Setting stripped output directory: ' + od_stripped)
-                    self.od_re = re.compile(od_stripped)
-                    self.output_directory = self.root_images_directory + "geo_loc/" + od_stripped + "/"
                     print('   User output directory: ' + self.output_directory)
         else:
             if self.user_output_directory:
@@ -128,6 +323,49 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
         else:
             pass
     
+    def nominatim(self):
+        # geopy is only needed when the geocode cache misses, so don't pay for
+        # importing it on --help, cache hits, or in spawned Pool workers.
+        if self.geolocator is None:
+            from geopy.geocoders import Nominatim
+            self.geolocator = Nominatim(user_agent="github/stbrie: geo_image_search")
+        return self.geolocator
+
+    def cached_location(self, key, lookup):
+        # Nominatim allows one request a second, and most runs ask for the same
+        # place as the last one, so keep answers on disk between runs.  Entries
+        # are plain (address, latitude, longitude) tuples, so any entry point can
+        # unpickle them; one that won't unpickle counts as a miss.  Misses aren't
+        # cached; if the cache can't be opened, just ask Nominatim.  Only the
+        # shelve work is inside the try blocks, so lookup() never runs twice.
+        try:
+            os.makedirs(os.path.dirname(GEOCODE_CACHE), exist_ok=True)
+            with shelve.open(GEOCODE_CACHE) as cache:
+                entry = cache.get(key)
+        except dbm.error as e:
+            if self.verbose:
+                print(f"Geocode cache unavailable: {e}")
+            return lookup()
+        except Exception as e: # e.g. an entry pickled by reference to a class that moved
+            if self.verbose:
+                print(f"Ignoring unreadable cached location for {key}: {e}")
+            entry = None
+        if isinstance(entry, tuple) and len(entry) == 3:
+            if self.verbose:
+                print(f"Using cached location for {key}")
+            return CachedLocation(*entry)
+
+        location = lookup()
+        if location:
+            location = CachedLocation(location.address, location.latitude, location.longitude)
+            try:
+                with shelve.open(GEOCODE_CACHE) as cache:
+                    cache[key] = tuple(location)
+            except dbm.error as e:
+                if self.verbose:
+                    print(f"Geocode cache unavailable: {e}")
+        return location
+
     def set_location(self):
         
         if (not self.address) and (not (self.lat and self.lon)):
@@ -135,7 +373,8 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
             sys.exit(5)
         if self.address:
             print(f"User address is {str(self.address)}")
-            self.location = self.geolocator.geocode(query=self.address)
+            self.location = self.cached_location(f"fwd:{self.address.strip().lower()}",
+                                                 lambda: self.nominatim().geocode(query=self.address))
             if not self.location:
                 # TODO: geopy has exceptions we could use.  That might be more useful than this.
                 print("User address does not return a valid location object.")
@@ -144,7 +383,8 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
                 pass # success!
         else:
             if self.lon and self.lat:
-                self.location=self.geolocator.reverse(query=f"{str(self.lat)}, {str(self.lon)}")
+                self.location = self.cached_location(f"rev:{round(float(self.lat), 4)}:{round(float(self.lon), 4)}",
+                                                     lambda: self.nominatim().reverse(query=f"{str(self.lat)}, {str(self.lon)}"))
                 if not self.location:
                     # TODO: geopy has exceptions we could use.  That might be more useful than this.
                     print("Latitude, Longitude does not return a valid location object.")
@@ -153,182 +393,127 @@ class GeoImageSearch: # pylint: disable=too-many-instance-attributes
                     pass # success!
 
         self.search_coords = (self.location.latitude, self.location.longitude)
+        self.distance_miles = haversine_from(*self.search_coords)
+        self.in_search_box = search_box(*self.search_coords, self.radius)
         print(f"Nominatum address: {self.location.address}")
         print(f"Lat, Lon: {str(self.location.latitude)}, {str(self.location.longitude)}")
 
     def startup(self):
         self.get_opts()
-        pp = pprint.PrettyPrinter(indent=4)
-        
         print("User address is " + str(self.address))
         self.set_location()
         self.set_directories()
+        if self.output_directory and self.output_directory != "Do Not Save":
+            self.output_prefix = os.path.normpath(self.output_directory) + os.sep
 
-    def calc_distance(self, dir_path, file_name, image_file):
-        try:
-            my_image = Image(image_file)          
-        except Exception as e:
-            print(f"Corrupt file? {e}")
-        lat_deg_dec = None
-        long_deg_dec = None
-
-        try:
-            lat_deg_dec = my_image.gps_latitude[0]
-            lat_deg_dec = lat_deg_dec + my_image.gps_latitude[1]/60
-            lat_deg_dec = lat_deg_dec + my_image.gps_latitude[2]/3600
-        except AttributeError:
-            if gis.verbose:
-                print (f"{imagename} has no latitude.")
-            else:
-                pass
-        except Exception as e:
-            if gis.verbose:
-                print(f"{imagename}: {e}")
-            else:
-                pass                    
-        try:
-            long_deg_dec = my_image.gps_longitude[0]
-            long_deg_dec = long_deg_dec + my_image.gps_longitude[1]/60
-            long_deg_dec = long_deg_dec + my_image.gps_longitude[2]/3600
-        except AttributeError:
-            if self.verbose:
-                print (f"{imagename} has no longitude.")
-            else:
-                pass
-        except Exception as e:
-            if self.verbose:
-                print(f"{imagename}: {e}")
-            else:
-                pass                        
-        if lat_deg_dec and long_deg_dec:
-            long_deg_dec = -1 * long_deg_dec # TODO: Make this not stupid.
-            
-            image_loc = (lat_deg_dec, long_deg_dec)
-            distance_miles = distance.distance(self.search_coords, image_loc).miles
-            if distance_miles < gis.radius:
-                if gis.verbose:
-                    print("+ " +
-                            self.loc_format.format(file_name,
-                                                lat_deg_dec,
-                                                long_deg_dec,
-                                                distance_miles))
+    def calc_distance(self, dir_path, file_name, gps, dir_printed, out):
+        # gps: the (latitude, longitude, notes) tuple from read_gps_coords().
+        # dir_printed: has the dir_path header been printed yet?  Returned updated
+        # so the walker can keep it as a per-directory local.
+        # out: list the report lines are appended to; the caller writes them.
+        verbose = self.verbose
+        imagename = os.path.join(dir_path, file_name)
+        lat_deg_dec, long_deg_dec, notes = gps
+        if verbose:
+            for note in notes:
+                out.append(f"{imagename}{note}\n")
+        if lat_deg_dec is not None and long_deg_dec is not None:
+            if not (verbose and self.far) and not self.in_search_box(lat_deg_dec, long_deg_dec):
+                return dir_printed # certainly outside the radius; skip the trig
+            distance_miles = self.distance_miles(lat_deg_dec, long_deg_dec)
+            if distance_miles < self.radius:
+                if verbose:
+                    out.append(f"+ {file_name}: {lat_deg_dec:.7g}, {long_deg_dec:.7g} ({distance_miles:.3g})\n")
                 else:
-                    if self.printed_directory.get(dir_path, False):
-                        pass # already printed it.
-                    else:
-
-                        print(f"\n{dir_path}: ")
-                        self.printed_directory[dir_path] = True
+                    if not dir_printed:
+                        out.append(f"\n{dir_path}: \n")
+                        dir_printed = True
 
-                    print(f"   + {file_name} {distance_miles:.2f}mi")
+                    out.append(f"   + {file_name} {distance_miles:.2f}mi\n")
                 if self.output_directory and not self.find_only:
                     destination = f"{self.output_directory}/{file_name}"
-                    copyfile(imagename, destination)
+                    fast_copy(imagename, destination)
             else:
-                if self.verbose and self.far:
-                    print("X " +
-                            self.loc_format.format(file_name,
-                                                lat_deg_dec,
-                                                long_deg_dec,
-                                                distance_miles))
+                if verbose and self.far:
+                    out.append(f"X {file_name}: {lat_deg_dec:.7g}, {long_deg_dec:.7g} ({distance_miles:.3g})\n")
         else:
             pass # no lattitude and longitude from the image.  Can't calculate distance.
+        return dir_printed
 
+    def walk_images(self, root, skip_prefix=None):
+        # os.scandir() based stand-in for os.walk(): a DirEntry already knows if it
+        # is a directory, so classifying entries costs no extra stat() calls.
+        # Yields (dir_path, jpeg file names, note) for every directory, parents
+        # first, and never descends into a directory under skip_prefix.  This runs
+        # on the Pool's task-feeding thread, ahead of the main loop, so it prints
+        # nothing itself: note is the message (or None) for the main loop to write
+        # when it reaches that directory.  Uses its own stack rather than
+        # recursion, so deep trees don't pass every result up through a chain of
+        # nested generators.
+        pending = [(root, False)]
+        while pending:
+            dir_path, skipped = pending.pop()
+            if skipped:
+                yield dir_path, [], f"Skipping output_directory... {dir_path}\n"
+                continue
+            image_names = []
+            sub_dirs = []
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            sub_dirs.append(entry.path)
+                        elif entry.name.endswith(JPEG_EXTENSIONS):
+                            image_names.append(entry.name)
+            except OSError as e:
+                yield dir_path, [], f"{dir_path}: {e}\n" if self.verbose else None
+                continue
+            yield dir_path, image_names, None
+            for sub_dir in reversed(sub_dirs): # reversed: pop() visits them in scandir order
+                skipped = bool(skip_prefix) and (os.path.normpath(sub_dir) + os.sep).startswith(skip_prefix)
+                pending.append((sub_dir, skipped))
 
+    def image_batches(self):
+        # Work units for read_gps_batch(): every directory (even one without
+        # JPEGs, so progress still counts it) split into IMAGE_BATCH_SIZE chunks.
+        # The walk's note rides along with the directory's first batch.
+        for dir_path, image_names, note in self.walk_images(self.root_images_directory, self.output_prefix):
+            yield dir_path, image_names[:IMAGE_BATCH_SIZE], note
+            for start in range(IMAGE_BATCH_SIZE, len(image_names), IMAGE_BATCH_SIZE):
+                yield dir_path, image_names[start:start + IMAGE_BATCH_SIZE], None
 
-    files_list = []
-    file_counter = 0
 
-
-            
 if __name__ == '__main__':
     gis = GeoImageSearch()
     gis.startup()
-    files_list = []
-    file_counter = 0
-    dirpath = ''
-    dirnames = []
-    filenames = []
     fifty_counter = 0
-    for dirpath, dirnames, filenames in os.walk(gis.root_images_directory):
-        fifty_counter = fifty_counter + 1
-        if gis.verbose:
-            print(f"{dirpath=}")
-        else:
-            print(".", end="", flush=True)
-            if fifty_counter % 50 == 0:
-                print("",flush=True)
-                print(f"{fifty_counter}: ", end="", flush=True)
-            else:
-                pass
-        if gis.od_re is not None and gis.od_re.search(dirpath):
-            print(f"Skipping output_directory... {dirpath}")
-            continue
+    current_dir = None
+    dir_printed = False
+    # imap() pulls batches from the walk lazily and hands results back in walk
+    # order, so directories stream through the workers without waiting on one
+    # another and the output still comes out grouped by directory.
+    with Pool(gis.workers) as pool:
+        for dirpath, image_names, note, gps_list in pool.imap(read_gps_batch, gis.image_batches()):
+            out = [] # this batch's report, written with one call at the end
+            if dirpath != current_dir:
+                current_dir = dirpath
+                dir_printed = False
+                fifty_counter = fifty_counter + 1
+                if gis.verbose:
+                    out.append(f"{dirpath=}\n")
+                else:
+                    # One flush per 50 directories rather than one per dot.
+                    sys.stdout.write(".")
+                    if fifty_counter % 50 == 0:
+                        sys.stdout.write(f"\n{fifty_counter}: ")
+                        sys.stdout.flush()
+            if note:
+                out.append(note)
 
-        for file_name in filenames:
-            if gis.jpeg_file_regex.search(file_name):
-                imagename = os.path.join(dirpath, file_name)
-                with open(imagename, 'rb') as image_file:
-                    try:
-                        gis.calc_distance(dirpath, file_name, image_file)
-                    except Exception as e:
-                        print(e)
-                        
-                    # my_image = Image(image_file)
-                        
-                    # lat_deg_dec = None
-                    # long_deg_dec = None
-                    # try:
-                    #     lat_deg_dec = my_image.gps_latitude[0]
-                    #     lat_deg_dec = lat_deg_dec + my_image.gps_latitude[1]/60
-                    #     lat_deg_dec = lat_deg_dec + my_image.gps_latitude[2]/3600
-                    # except AttributeError:
-                    #     if gis.verbose:
-                    #         print (f"{imagename} has no latitude.")
-                    #     else:
-                    #         pass
-                    # except Exception as e:
-                    #     if gis.verbose:
-                    #         print(f"{imagename}: {e}")
-                    #     else:
-                    #         pass                    
-                    # try:
-                    #     long_deg_dec = my_image.gps_longitude[0]
-                    #     long_deg_dec = long_deg_dec + my_image.gps_longitude[1]/60
-                    #     long_deg_dec = long_deg_dec + my_image.gps_longitude[2]/3600
-                    # except AttributeError:
-                    #     if gis.verbose:
-                    #         print (f"{imagename} has no longitude.")
-                    #     else:
-                    #         pass
-                    # except Exception as e:
-                    #     if gis.verbose:
-                    #         print(f"{imagename}: {e}")
-                    #     else:
-                    #         pass                        
-                    # if lat_deg_dec and long_deg_dec:
-                    #     long_deg_dec = -1 * long_deg_dec # TODO: Make this not stupid.
-                        
-                    #     image_loc = (lat_deg_dec, long_deg_dec)
-                    #     distance_miles = distance.distance(gis.search_coords, image_loc).miles
-                    #     if distance_miles < gis.radius:
-                    #         if gis.verbose:
-                    #             print("+ " +
-                    #                   gis.loc_format.format(file_name,
-                    #                                         lat_deg_dec,
-                    #                                         long_deg_dec,
-                    #                                         distance_miles))
-                    #         else:
-                    #             print(f"+ {file_name} {distance_miles}mi")
-                    #         if gis.output_directory and not gis.find_only:
-                    #             destination = f"{gis.output_directory}/{file_name}"
-                    #             copyfile(imagename, destination)
-                    #     else:
-                    #         if gis.verbose and gis.far:
-                    #             print("X " +
-                    #                   gis.loc_format.format(file_name,
-                    #                                         lat_deg_dec,
-                    #                                         long_deg_dec,
-                    #                                         distance_miles))
-                    # else:
-                    #     pass # no lattitude and longitude from the image.  Can't calculate distance.
+            for file_name, gps in zip(image_names, gps_list):
+                try:
+                    dir_printed = gis.calc_distance(dirpath, file_name, gps, dir_printed, out)
+                except Exception as e:
+                    out.append(f"{e}\n")
+            if out:
+                sys.stdout.write("".join(out))
@@ -0,0 +1,92 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+from geo_image_search import read_exif_block, read_gps_coords
+
+
+def exif_jpeg(order, lat=None, lon=None, lat_ref=b'N', lon_ref=b'E'):
+    # A minimal JPEG whose EXIF block holds a GPS IFD with the given refs and
+    # (num, den) rational triples; with neither lat nor lon, IFD0 has no GPS IFD.
+    o = '<' if order == b'II' else '>'
+    if lat is None and lon is None:
+        ifd0 = struct.pack(o + 'H', 0) + struct.pack(o + 'I', 0)
+        tiff = order + struct.pack(o + 'HI', 42, 8) + ifd0
+    else:
+        gps_ifd = 8 + 2 + 12 + 4
+        data = gps_ifd + 2 + 12 * 4 + 4
+        entries = (struct.pack(o + 'HHI', 1, 2, 2) + lat_ref + b'\0\0\0'
+                   + struct.pack(o + 'HHII', 2, 5, 3, data)
+                   + struct.pack(o + 'HHI', 3, 2, 2) + lon_ref + b'\0\0\0'
+                   + struct.pack(o + 'HHII', 4, 5, 3, data + 24))
+        values = b''.join(struct.pack(o + 'II', *part) for part in lat + lon)
+        tiff = (order + struct.pack(o + 'HI', 42, 8)
+                + struct.pack(o + 'HHHII', 1, 0x8825, 4, 1, gps_ifd) + struct.pack(o + 'I', 0)
+                + struct.pack(o + 'H', 4) + entries + struct.pack(o + 'I', 0) + values)
+    app1 = b'Exif\0\0' + tiff
+    return b'\xff\xd8\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1 + b'\xff\xd9'
+
+
+class ReadExifBlockTest(unittest.TestCase):
+    # Truncated segment headers used to seek backwards onto the same marker
+    # and spin forever; they must fail instead.
+    def test_file_ends_after_marker(self):
+        with self.assertRaisesRegex(ValueError, "truncated JPEG segment"):
+            read_exif_block(io.BytesIO(b'\xff\xd8\xff\xe0'))
+
+    def test_short_app1(self):
+        with self.assertRaisesRegex(ValueError, "truncated JPEG segment"):
+            read_exif_block(io.BytesIO(b'\xff\xd8\xff\xe1\x00\x08Exi'))
+
+    def test_app1_length_too_small(self):
+        with self.assertRaisesRegex(ValueError, "truncated JPEG segment"):
+            read_exif_block(io.BytesIO(b'\xff\xd8\xff\xe1\x00\x04http://ns'))
+
+    def test_exif_block(self):
+        jpeg = b'\xff\xd8\xff\xe1\x00\x0cExif\x00\x00MM\x00\x2a\xff\xd9'
+        self.assertEqual(read_exif_block(io.BytesIO(jpeg)), b'MM\x00\x2a')
+
+
+class ReadGpsCoordsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def coords(self, jpeg):
+        path = os.path.join(self.tmp.name, "image.jpg")
+        with open(path, 'wb') as image_file:
+            image_file.write(jpeg)
+        return read_gps_coords(path)
+
+    def test_little_endian_north_west(self):
+        lat, lon, notes = self.coords(exif_jpeg(b'II', ((40, 1), (30, 1), (0, 1)),
+                                                ((75, 1), (15, 1), (36, 1)), b'N', b'W'))
+        self.assertAlmostEqual(lat, 40.5)
+        self.assertAlmostEqual(lon, -75.26)
+        self.assertEqual(notes, [])
+
+    def test_big_endian_south_east(self):
+        lat, lon, notes = self.coords(exif_jpeg(b'MM', ((33, 1), (52, 1), (76, 10)),
+                                                ((151, 1), (12, 1), (3348, 100)), b'S', b'E'))
+        self.assertAlmostEqual(lat, -(33 + 52 / 60 + 7.6 / 3600))
+        self.assertAlmostEqual(lon, 151 + 12 / 60 + 33.48 / 3600)
+        self.assertEqual(notes, [])
+
+    def test_zero_coordinates(self):
+        zero = ((0, 1), (0, 1), (0, 1))
+        self.assertEqual(self.coords(exif_jpeg(b'II', zero, zero)), (0.0, 0.0, []))
+
+    def test_no_gps_ifd(self):
+        self.assertEqual(self.coords(exif_jpeg(b'II')),
+                         (None, None, [" has no latitude.", " has no longitude."]))
+
+    def test_zero_denominator(self):
+        self.assertEqual(self.coords(exif_jpeg(b'MM', ((40, 1), (30, 0), (0, 1)),
+                                               ((75, 1), (15, 1), (36, 1)))),
+                         (None, None, [": division by zero"]))
+
+
+if __name__ == '__main__':
+    unittest.main()